@@ -1,22 +1,26 @@
 from __future__ import annotations
 
-import base64
+import atexit
+import binascii
 import dataclasses
+import functools
+import heapq
 import io
+import logging
+import math
 import os
+import queue
 import random
+import secrets
 import sqlite3
 import threading
-from datetime import datetime
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Sequence
-from uuid import uuid4
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
 import unicodedata
 
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-
 from flask import (
     Flask,
     jsonify,
@@ -25,12 +29,27 @@ from flask import (
     send_from_directory,
     url_for,
 )
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ModuleNotFoundError:  # pragma: no cover - falls back to Flask's stdlib encoder
+    orjson = None
 
 
+LOGGER = logging.getLogger(__name__)
+
 BASE_DIR = Path(__file__).parent
 AUDIO_ROOT = BASE_DIR / "chinese_audio"
 FEEDBACK_ROOT = BASE_DIR / "sounds" / "feedback"
 DATABASE_PATH = BASE_DIR / "tone_stats.db"
+AUDIO_MAX_AGE = 86400
+MAX_ACTIVE_ROUNDS = 10000
+ROUND_TTL_SECONDS = 1800
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+ROUND_ID_BYTES = 16
+# token_urlsafe is unpadded base64url: 4 characters per 3 bytes, rounded up.
+ROUND_ID_LENGTH = math.ceil(ROUND_ID_BYTES * 4 / 3)
 
 CATPPUCCIN = {
     "crust": "#11111b",
@@ -49,6 +68,8 @@ CATPPUCCIN = {
 }
 
 
+# Only for catalog labels: the cache stays bounded by the MP3 files on disk.
+@functools.lru_cache(maxsize=4096)
 def normalize_label(label: str) -> str:
     return unicodedata.normalize("NFC", label)
 
@@ -58,6 +79,7 @@ class ToneClip:
     difficulty: str
     file_name: str
     label: str
+    label_norm: str
 
 
 @dataclasses.dataclass(slots=True)
@@ -71,42 +93,306 @@ class RoundState:
     option_count: int
     selected_difficulties: List[str]
     attempts: int = 0
+    last_seen: float = dataclasses.field(default_factory=time.monotonic)
+
+
+@dataclasses.dataclass(slots=True)
+class RollingAccuracy:
+    points: List[dict] = dataclasses.field(default_factory=list)
+    total: int = 0
+    correct: int = 0
+    loaded: bool = False
+
+    def append(self, timestamp: str, is_correct: bool) -> None:
+        self.total += 1
+        if is_correct:
+            self.correct += 1
+        self.points.append({"timestamp": timestamp, "accuracy": self.correct / self.total})
+
+    def extend(self, rows: Iterable[Tuple[str, int]]) -> None:
+        # Bulk path for seeding from the database: keep the running totals in
+        # locals so the per-row work is a tuple unpack, an add and a divide.
+        total = self.total
+        correct = self.correct
+        append = self.points.append
+        for timestamp, is_correct in rows:
+            total += 1
+            correct += is_correct
+            append({"timestamp": timestamp, "accuracy": correct / total})
+        self.total = total
+        self.correct = correct
+
+    def clear(self) -> None:
+        self.points.clear()
+        self.total = 0
+        self.correct = 0
 
 
 def discover_tones() -> Dict[str, List[ToneClip]]:
     tones: Dict[str, List[ToneClip]] = {}
     if not AUDIO_ROOT.exists():
         return tones
-    for difficulty_dir in sorted(AUDIO_ROOT.iterdir()):
-        if not difficulty_dir.is_dir():
-            continue
+    # scandir's DirEntry type checks come from the directory listing itself,
+    # so the walk needs no per-file stat() or Path objects.
+    with os.scandir(AUDIO_ROOT) as root_entries:
+        difficulty_dirs = sorted(
+            (entry for entry in root_entries if entry.is_dir()),
+            key=lambda entry: entry.name,
+        )
+    for difficulty_dir in difficulty_dirs:
         difficulty = difficulty_dir.name
         entries: List[ToneClip] = []
-        for file_path in difficulty_dir.glob("*.mp3"):
-            entries.append(
-                ToneClip(
-                    difficulty=difficulty,
-                    file_name=file_path.name,
-                    label=normalize_label(file_path.stem),
+        with os.scandir(difficulty_dir.path) as clip_entries:
+            for entry in clip_entries:
+                name = entry.name
+                # Dotfiles are skipped on purpose (Path.glob matched them), so
+                # macOS "._*.mp3" resource forks never become clips.
+                if name.startswith(".") or not name.endswith(".mp3") or not entry.is_file():
+                    continue
+                label = normalize_label(name[: -len(".mp3")])
+                entries.append(
+                    ToneClip(
+                        difficulty=difficulty,
+                        file_name=name,
+                        label=label,
+                        label_norm=label,
+                    )
                 )
-            )
         if entries:
             tones[difficulty] = entries
     return tones
 
 
 AVAILABLE_TONES = discover_tones()
+# The catalog is fixed for the life of the process, so build the view once.
+DIFFICULTIES = tuple(sorted(AVAILABLE_TONES))
+AUDIO_DIRS = {difficulty: str(AUDIO_ROOT / difficulty) for difficulty in AVAILABLE_TONES}
 ROUND_LOCK = threading.Lock()
-ACTIVE_ROUNDS: Dict[str, RoundState] = {}
+# Ordered least- to most-recently used, so eviction only looks at the front.
+ACTIVE_ROUNDS: "OrderedDict[str, RoundState]" = OrderedDict()
+STATS_LOCK = threading.Lock()
+STATS_VERSION = 0
+STATS_CACHE: Dict[str, Tuple[int, bytes]] = {}
+CHART_FORMATS = ("data", "png")
+ROLLING_LOCK = threading.Lock()
+ROLLING_ACCURACY = RollingAccuracy()
+
+
+# Per-connection settings; journal_mode=WAL is persistent and set once in
+# ensure_database(), which is what makes synchronous=NORMAL safe here.
+# Long-lived pooled connections keep their prepared statements; size the
+# per-connection cache so the stats queries and the INSERT never get evicted.
+STATEMENT_CACHE_SIZE = 256
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=67108864",
+    "PRAGMA cache_size=-20000",
+)
+
+
+class ConnectionPool:
+    """A single locked writer plus a bounded pool of read-only WAL readers."""
+
+    def __init__(self, path: Path, min_size: int = 2, max_size: int = 8) -> None:
+        self.path = path
+        self.max_size = max_size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        for _ in range(min_size):
+            self._idle.put(self._open_reader())
+            self._opened += 1
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _open_reader(self) -> sqlite3.Connection:
+        conn = self._connect()
+        conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.max_size
+                if can_open:
+                    self._opened += 1
+            if not can_open:
+                conn = self._idle.get()
+            else:
+                try:
+                    return self._open_reader()
+                except BaseException:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+        try:
+            conn.execute("SELECT 1")
+        except sqlite3.Error:
+            conn.close()
+            conn = self._open_reader()
+        return conn
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            self._release(conn)
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        with self._write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            opened = self._opened
+        idle = self._idle.qsize()
+        return {"max_size": self.max_size, "open": opened, "idle": idle, "in_use": opened - idle}
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+        with self._write_lock:
+            self._writer.close()
+
+
+DB_POOL = ConnectionPool(DATABASE_PATH, min_size=2, max_size=8)
+atexit.register(DB_POOL.close)
+
+
+INSERT_GUESS_SQL = """
+    INSERT INTO guesses (
+        timestamp,
+        round_id,
+        difficulty,
+        tone_label,
+        chosen_label,
+        is_correct,
+        attempt_number,
+        option_count
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class GuessWriter:
+    """Stores queued guesses from a background thread in batched transactions."""
+
+    def __init__(
+        self, batch_size: int = 256, interval: float = 0.05, flush_timeout: float = 5.0
+    ) -> None:
+        self.batch_size = batch_size
+        self.interval = interval
+        self.flush_timeout = flush_timeout
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        # Rows handed to put() and not yet committed (or dropped).
+        self._pending = 0
+        self._drained = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="guess-writer", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def put(self, row: tuple) -> None:
+        with self._drained:
+            self._pending += 1
+        self._queue.put(row)
+
+    def flush(self) -> bool:
+        # Bounded so a wedged writer cannot hang the stats and reset endpoints
+        # forever; returns False if rows were still pending at the deadline.
+        with self._drained:
+            if self._drained.wait_for(lambda: not self._pending, self.flush_timeout):
+                return True
+            LOGGER.warning(
+                "Timed out waiting for %d queued guesses to be written.", self._pending
+            )
+            return False
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                rows = [self._queue.get(timeout=self.interval)]
+            except queue.Empty:
+                continue
+            while len(rows) < self.batch_size:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with DB_POOL.write() as conn:
+                    conn.executemany(INSERT_GUESS_SQL, rows)
+            except Exception:
+                # Keep the thread alive: if it died, nothing would drain the
+                # queue again.
+                LOGGER.exception("Dropped %d guesses that could not be written.", len(rows))
+            finally:
+                with self._drained:
+                    self._pending -= len(rows)
+                    if not self._pending:
+                        self._drained.notify_all()
+
+
+GUESS_WRITER = GuessWriter()
+GUESS_WRITER.start()
+# The writer is a daemon thread; drain whatever is still queued at exit.
+atexit.register(GUESS_WRITER.stop)
 
 
 def ensure_database() -> None:
-    with sqlite3.connect(DATABASE_PATH) as conn:
+    with DB_POOL.write() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS guesses (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
+                timestamp TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now')),
                 round_id TEXT NOT NULL,
                 difficulty TEXT NOT NULL,
                 tone_label TEXT NOT NULL,
@@ -117,32 +403,35 @@ def ensure_database() -> None:
             )
             """
         )
-        conn.commit()
-
-
-def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def record_guess(round_state: RoundState, choice_label: str, is_correct: bool) -> int:
-    timestamp = datetime.utcnow().isoformat(timespec="seconds")
-    with get_connection() as conn:
         conn.execute(
-            """
-            INSERT INTO guesses (
-                timestamp,
-                round_id,
-                difficulty,
-                tone_label,
-                chosen_label,
-                is_correct,
-                attempt_number,
-                option_count
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+            "CREATE INDEX IF NOT EXISTS idx_guesses_ts ON guesses(timestamp)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_guesses_round_correct "
+            "ON guesses(round_id, is_correct)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_guesses_difficulty "
+            "ON guesses(difficulty, is_correct)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_guesses_tone "
+            "ON guesses(tone_label, is_correct)"
+        )
+    load_rolling_accuracy()
+
+
+def record_guess(
+    round_state: RoundState,
+    choice_label: str,
+    is_correct: bool,
+    attempt_number: int,
+) -> int:
+    # Stamped once here so the stored row and the in-memory cumulative
+    # point carry the same time.
+    timestamp = time.strftime(TIMESTAMP_FORMAT, time.gmtime())
+    with ROLLING_LOCK:
+        GUESS_WRITER.put(
             (
                 timestamp,
                 round_state.id,
@@ -150,44 +439,50 @@ def record_guess(round_state: RoundState, choice_label: str, is_correct: bool) -
                 round_state.correct_label,
                 choice_label,
                 1 if is_correct else 0,
-                round_state.attempts,
+                attempt_number,
                 round_state.option_count,
-            ),
+            )
         )
-        conn.commit()
-    return round_state.attempts
+        ROLLING_ACCURACY.append(timestamp, is_correct)
+    invalidate_stats()
+    return attempt_number
+
+
+@functools.lru_cache(maxsize=64)
+def pool_for(difficulties: frozenset[str]) -> Tuple[ToneClip, ...]:
+    pool: List[ToneClip] = []
+    for diff in sorted(difficulties):
+        pool.extend(AVAILABLE_TONES.get(diff, ()))
+    return tuple(pool)
 
 
 def pick_round(
     difficulties: Sequence[str],
     option_count: int,
 ) -> RoundState:
-    pools: List[ToneClip] = []
-    for diff in difficulties:
-        if diff not in AVAILABLE_TONES:
-            continue
-        pools.extend(AVAILABLE_TONES[diff])
-    if not pools:
+    pool = pool_for(frozenset(difficulties))
+    if not pool:
         raise ValueError("No audio clips available for the chosen difficulties.")
 
-    target = random.choice(pools)
-    other_choices = [
-        clip for clip in pools if normalize_label(clip.label) != normalize_label(target.label)
-    ]
-    random.shuffle(other_choices)
-    selected = other_choices[: max(0, option_count - 1)]
-    options_labels = [normalize_label(target.label)] + [
-        normalize_label(clip.label) for clip in selected
-    ]
+    # Sample one spare clip so a distractor sharing the target's label can be
+    # dropped without coming up short.
+    sampled = random.sample(pool, k=min(option_count + 1, len(pool)))
+    target = sampled[0]
+    distractors = [clip for clip in sampled[1:] if clip.label_norm != target.label_norm]
+    if len(distractors) < option_count - 1:
+        distractors = [clip for clip in pool if clip.label_norm != target.label_norm]
+        random.shuffle(distractors)
+    selected = distractors[: max(0, option_count - 1)]
+    options_labels = [target.label_norm] + [clip.label_norm for clip in selected]
     random.shuffle(options_labels)
 
-    round_id = str(uuid4())
+    round_id = secrets.token_urlsafe(ROUND_ID_BYTES)
     return RoundState(
         id=round_id,
         difficulty=target.difficulty,
         file_name=target.file_name,
         correct_label=target.label,
-        correct_label_norm=normalize_label(target.label),
+        correct_label_norm=target.label_norm,
         options=options_labels,
         option_count=option_count,
         selected_difficulties=list(difficulties),
@@ -229,31 +524,67 @@ def get_accuracy_by_difficulty(conn: sqlite3.Connection) -> List[dict]:
     ]
 
 
-def get_rolling_accuracy(conn: sqlite3.Connection) -> List[dict]:
-    rows = conn.execute(
-        """
-        SELECT timestamp, is_correct
-        FROM guesses
-        ORDER BY datetime(timestamp)
-        """
-    ).fetchall()
-    total = 0
-    correct = 0
-    points = []
-    for row in rows:
-        total += 1
-        correct += int(row["is_correct"])
-        accuracy = correct / total if total else 0.0
-        points.append(
-            {
-                "timestamp": row["timestamp"],
-                "accuracy": accuracy,
-            }
-        )
-    return points
+def load_rolling_accuracy() -> None:
+    with ROLLING_LOCK:
+        if ROLLING_ACCURACY.loaded:
+            return
+        with DB_POOL.read() as conn:
+            cursor = conn.execute(
+                """
+                SELECT timestamp, is_correct
+                FROM guesses
+                ORDER BY timestamp, id
+                """
+            )
+            # Plain tuples are cheaper to build and unpack than sqlite3.Row.
+            cursor.row_factory = None
+            ROLLING_ACCURACY.extend(cursor)
+        ROLLING_ACCURACY.loaded = True
+
+
+def get_rolling_accuracy() -> List[dict]:
+    with ROLLING_LOCK:
+        return list(ROLLING_ACCURACY.points)
+
+
+@functools.lru_cache(maxsize=None)
+def load_pyplot():
+    # matplotlib is only needed for ?charts=png, so keep it out of startup.
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def figure_to_data_uri(fig) -> str:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+    load_pyplot().close(fig)
+
+    # The charts are a few theme colors plus anti-aliasing, so an adaptive
+    # 64-color palette PNG looks the same at roughly half the bytes.
+    buf.seek(0)
+    image = Image.open(buf).convert("RGB").quantize(colors=64)
+    out = io.BytesIO()
+    image.save(out, format="PNG", optimize=True)
+    encoded = binascii.b2a_base64(out.getbuffer(), newline=False).decode("ascii")
+    return f"data:image/png;base64,{encoded}"
 
 
 def make_bar_chart(data: List[dict]) -> str:
+    return _render_bar_chart(
+        tuple((entry["difficulty"], entry["accuracy"]) for entry in data)
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _render_bar_chart(data: Tuple[Tuple[str, float], ...]) -> str:
+    plt = load_pyplot()
     fig, ax = plt.subplots(figsize=(5.5, 3.0))
     ax.set_facecolor(CATPPUCCIN["base"])
     fig.patch.set_facecolor(CATPPUCCIN["base"])
@@ -271,8 +602,8 @@ def make_bar_chart(data: List[dict]) -> str:
         ax.set_xticks([])
         ax.set_yticks([])
     else:
-        labels = [entry["difficulty"] for entry in data]
-        values = [entry["accuracy"] * 100 for entry in data]
+        labels = [difficulty for difficulty, _ in data]
+        values = [accuracy * 100 for _, accuracy in data]
         colors = [CATPPUCCIN["teal"], CATPPUCCIN["blue"], CATPPUCCIN["lavender"]]
         chosen_colors = (colors * ((len(values) // len(colors)) + 1))[: len(values)]
         bars = ax.bar(labels, values, color=chosen_colors)
@@ -292,14 +623,16 @@ def make_bar_chart(data: List[dict]) -> str:
                 fontsize=10,
             )
 
-    buf = io.BytesIO()
-    fig.tight_layout()
-    fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    return f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode('ascii')}"
+    return figure_to_data_uri(fig)
 
 
 def make_line_chart(points: List[dict]) -> str:
+    return _render_line_chart(tuple(point["accuracy"] for point in points))
+
+
+@functools.lru_cache(maxsize=8)
+def _render_line_chart(points: Tuple[float, ...]) -> str:
+    plt = load_pyplot()
     fig, ax = plt.subplots(figsize=(5.5, 3.0))
     ax.set_facecolor(CATPPUCCIN["base"])
     fig.patch.set_facecolor(CATPPUCCIN["base"])
@@ -318,7 +651,7 @@ def make_line_chart(points: List[dict]) -> str:
         ax.set_yticks([])
     else:
         x = list(range(1, len(points) + 1))
-        y = [p["accuracy"] * 100 for p in points]
+        y = [accuracy * 100 for accuracy in points]
         ax.plot(x, y, color=CATPPUCCIN["peach"], linewidth=2)
         ax.fill_between(x, y, color=CATPPUCCIN["peach"], alpha=0.2)
         ax.set_ylim(0, 100)
@@ -329,21 +662,28 @@ def make_line_chart(points: List[dict]) -> str:
         ax.spines[:].set_color(CATPPUCCIN["surface1"])
         ax.set_title("Cumulative Accuracy", color=CATPPUCCIN["text"])
 
-    buf = io.BytesIO()
-    fig.tight_layout()
-    fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    return f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode('ascii')}"
+    return figure_to_data_uri(fig)
 
 
 def gather_summary(conn: sqlite3.Connection) -> dict:
     totals = conn.execute(
         """
+        WITH per_round AS (
+            SELECT
+                COUNT(*) AS guesses,
+                SUM(is_correct) AS correct,
+                SUM(CASE WHEN attempt_number = 1 AND is_correct = 1 THEN 1 ELSE 0 END) AS first_try,
+                MAX(CASE WHEN is_correct = 1 THEN attempt_number END) AS winning_attempt
+            FROM guesses
+            GROUP BY round_id
+        )
         SELECT
-            COUNT(*) AS total_guesses,
-            SUM(is_correct) AS total_correct,
-            SUM(CASE WHEN attempt_number = 1 AND is_correct = 1 THEN 1 ELSE 0 END) AS first_try
-        FROM guesses
+            SUM(guesses) AS total_guesses,
+            SUM(correct) AS total_correct,
+            SUM(first_try) AS first_try,
+            COUNT(winning_attempt) AS rounds_won,
+            AVG(winning_attempt) AS avg_attempts
+        FROM per_round
         """
     ).fetchone()
 
@@ -351,32 +691,13 @@ def gather_summary(conn: sqlite3.Connection) -> dict:
     total_correct = int(totals["total_correct"] or 0)
     first_try = int(totals["first_try"] or 0)
 
-    rounds_completed = conn.execute(
-        """
-        SELECT COUNT(DISTINCT round_id) AS rounds_won
-        FROM guesses
-        WHERE is_correct = 1
-        """
-    ).fetchone()["rounds_won"]
-
-    attempts_per_round = conn.execute(
-        """
-        SELECT AVG(attempts) AS avg_attempts FROM (
-            SELECT MAX(attempt_number) AS attempts
-            FROM guesses
-            WHERE is_correct = 1
-            GROUP BY round_id
-        )
-        """
-    ).fetchone()["avg_attempts"]
-
     return {
         "total_guesses": total_guesses,
         "total_correct": total_correct,
         "accuracy": (total_correct / total_guesses) if total_guesses else 0.0,
-        "rounds_completed": int(rounds_completed or 0),
+        "rounds_completed": int(totals["rounds_won"] or 0),
         "first_try_success": first_try,
-        "average_attempts_per_round": float(attempts_per_round or 0.0),
+        "average_attempts_per_round": float(totals["avg_attempts"] or 0.0),
     }
 
 
@@ -407,56 +728,117 @@ def get_tone_extremes(conn: sqlite3.Connection, limit: int = 5) -> dict:
     if not tones:
         return {"best": [], "worst": []}
 
-    sorted_best = sorted(
+    best = heapq.nsmallest(
+        limit,
         tones,
         key=lambda entry: (-entry["accuracy"], -entry["total"], entry["label"]),
     )
-    sorted_worst = sorted(
+    worst = heapq.nsmallest(
+        limit,
         tones,
         key=lambda entry: (entry["accuracy"], -entry["total"], entry["label"]),
     )
 
     return {
-        "best": sorted_best[:limit],
-        "worst": sorted_worst[:limit],
+        "best": best,
+        "worst": worst,
     }
 
 
-def build_stats_payload() -> dict:
-    with get_connection() as conn:
+def invalidate_stats() -> None:
+    global STATS_VERSION
+    with STATS_LOCK:
+        STATS_VERSION += 1
+
+
+def json_bytes(obj: Any) -> bytes:
+    # orjson already produces bytes; decoding to str would only be undone
+    # again when the response is written.
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return app.json.dumps(obj).encode("utf-8")
+
+
+def get_stats_body(chart_format: str = "data") -> bytes:
+    # Readers take no lock: the version int and each cached (version, body)
+    # tuple are replaced by single reference assignments. STATS_LOCK only
+    # orders writers against each other.
+    version = STATS_VERSION
+    cached = STATS_CACHE.get(chart_format)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    flushed = GUESS_WRITER.flush()
+    body = json_bytes(build_stats_payload(chart_format))
+    if not flushed:
+        # Queued guesses are missing from this body; serve it but don't cache it.
+        return body
+    with STATS_LOCK:
+        # Only keep the body if no guess landed while it was being built.
+        if STATS_VERSION == version:
+            STATS_CACHE[chart_format] = (version, body)
+    return body
+
+
+def build_stats_payload(chart_format: str = "data") -> dict:
+    # Callers flush GUESS_WRITER first so the queued guesses are visible.
+    with DB_POOL.read() as conn:
+        # One read transaction, so all three aggregates see the same snapshot.
+        conn.execute("BEGIN")
         summary = gather_summary(conn)
         accuracy = get_accuracy_by_difficulty(conn)
-        rolling = get_rolling_accuracy(conn)
         tone_extremes = get_tone_extremes(conn)
+    rolling = get_rolling_accuracy()
 
-    return {
-        "summary": summary,
-        "graphs": {
+    if chart_format == "png":
+        graphs = {
             "accuracy_by_difficulty": make_bar_chart(accuracy),
             "cumulative_accuracy": make_line_chart(rolling),
-        },
+        }
+    else:
+        graphs = {
+            "accuracy_by_difficulty": accuracy,
+            "cumulative_accuracy": rolling,
+        }
+
+    return {
+        "summary": summary,
+        "graphs": graphs,
         "tones": tone_extremes,
     }
 
 
+class OrjsonProvider(JSONProvider):
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+
 app = Flask(
     __name__,
     template_folder=str(BASE_DIR / "templates"),
     static_folder=str(BASE_DIR / "static"),
 )
-app.config["JSON_SORT_KEYS"] = False
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+else:
+    app.json.sort_keys = False
 
-
-@app.before_request
-def startup() -> None:
-    ensure_database()
+# Schema setup and the rolling-accuracy seed run once per process, not per request.
+ensure_database()
 
 
 @app.route("/")
 def index() -> str:
     return render_template(
         "index.html",
-        difficulties=sorted(AVAILABLE_TONES.keys()),
+        difficulties=DIFFICULTIES,
     )
 
 
@@ -485,10 +867,34 @@ def parse_option_count(data: dict) -> int:
     return max(2, min(8, value))
 
 
+def evict_stale_rounds(now: float) -> None:
+    # Caller must hold ROUND_LOCK.
+    while ACTIVE_ROUNDS:
+        oldest = next(iter(ACTIVE_ROUNDS.values()))
+        if (
+            len(ACTIVE_ROUNDS) <= MAX_ACTIVE_ROUNDS
+            and now - oldest.last_seen < ROUND_TTL_SECONDS
+        ):
+            break
+        ACTIVE_ROUNDS.popitem(last=False)
+
+
+def lookup_round(round_id: str) -> RoundState | None:
+    # Caller must hold ROUND_LOCK.
+    now = time.monotonic()
+    evict_stale_rounds(now)
+    round_state = ACTIVE_ROUNDS.get(round_id)
+    if round_state is not None:
+        round_state.last_seen = now
+        ACTIVE_ROUNDS.move_to_end(round_id)
+    return round_state
+
+
 def create_round_response(difficulties: Sequence[str], option_count: int) -> dict:
     round_state = pick_round(difficulties, option_count)
     with ROUND_LOCK:
         ACTIVE_ROUNDS[round_state.id] = round_state
+        evict_stale_rounds(round_state.last_seen)
     return {
         "round": round_payload(round_state),
     }
@@ -528,19 +934,29 @@ def api_guess() -> tuple:
     if not choice or not isinstance(choice, str):
         return jsonify({"error": "Missing choice."}), 400
 
-    normalized_choice = normalize_label(choice)
+    if len(round_id) != ROUND_ID_LENGTH:
+        # Cannot name an active round; answer without touching ROUND_LOCK.
+        return jsonify({"error": "Round expired. Start a new game."}), 400
+
+    # Client input is unbounded, so it bypasses normalize_label's cache, which
+    # is meant for the catalog's labels.
+    normalized_choice = unicodedata.normalize("NFC", choice)
 
+    # Only the attempt counter and the active-round map are shared; everything
+    # else read from round_state below is fixed when the round is created.
     with ROUND_LOCK:
-        round_state = ACTIVE_ROUNDS.get(round_id)
-        if not round_state:
-            return jsonify({"error": "Round expired. Start a new game."}), 400
-        round_state.attempts += 1
-        attempt_number = round_state.attempts
-        is_correct = normalized_choice == round_state.correct_label_norm
-        if is_correct:
-            ACTIVE_ROUNDS.pop(round_id, None)
+        round_state = lookup_round(round_id)
+        if round_state is not None:
+            round_state.attempts += 1
+            attempt_number = round_state.attempts
+            is_correct = normalized_choice == round_state.correct_label_norm
+            if is_correct:
+                ACTIVE_ROUNDS.pop(round_id, None)
+
+    if round_state is None:
+        return jsonify({"error": "Round expired. Start a new game."}), 400
 
-    record_guess(round_state, normalized_choice, is_correct)
+    record_guess(round_state, normalized_choice, is_correct, attempt_number)
 
     feedback = url_for(
         "serve_feedback_audio",
@@ -559,8 +975,16 @@ def api_guess() -> tuple:
 
 @app.route("/api/stats", methods=["GET"])
 def api_stats() -> tuple:
-    payload = build_stats_payload()
-    return jsonify(payload)
+    chart_format = request.args.get("charts", "data")
+    if chart_format not in CHART_FORMATS:
+        return jsonify({"error": f"charts must be one of: {', '.join(CHART_FORMATS)}."}), 400
+    body = get_stats_body(chart_format)
+    return app.response_class(body, mimetype="application/json")
+
+
+@app.route("/api/health", methods=["GET"])
+def api_health() -> tuple:
+    return jsonify({"status": "ok", "db_pool": DB_POOL.stats()})
 
 
 @app.route("/api/end", methods=["POST"])
@@ -575,18 +999,31 @@ def api_end() -> tuple:
 
 @app.route("/api/reset", methods=["POST"])
 def api_reset() -> tuple:
-    with get_connection() as conn:
-        conn.execute("DELETE FROM guesses")
-        conn.commit()
+    with ROLLING_LOCK:
+        if not GUESS_WRITER.flush():
+            # Deleting now would let the queued rows land after the DELETE.
+            return jsonify({"error": "Pending guesses are still being saved. Try again."}), 503
+        with DB_POOL.write() as conn:
+            conn.execute("DELETE FROM guesses")
+        ROLLING_ACCURACY.clear()
+    invalidate_stats()
+    _render_bar_chart.cache_clear()
+    _render_line_chart.cache_clear()
     return jsonify({"status": "reset"})
 
 
 @app.route("/audio/<difficulty>/<path:filename>")
 def serve_audio(difficulty: str, filename: str):
-    directory = AUDIO_ROOT / difficulty
-    if not directory.exists():
+    directory = AUDIO_DIRS.get(difficulty)
+    if directory is None:
         return jsonify({"error": "Audio not found"}), 404
-    return send_from_directory(directory, filename)
+    return send_from_directory(
+        directory,
+        filename,
+        conditional=True,
+        etag=True,
+        max_age=AUDIO_MAX_AGE,
+    )
 
 
 @app.route("/feedback/<path:filename>")
@@ -594,9 +1031,14 @@ def serve_feedback_audio(filename: str):
     directory = FEEDBACK_ROOT
     if not directory.exists():
         return jsonify({"error": "Feedback not found"}), 404
-    return send_from_directory(directory, filename)
+    return send_from_directory(
+        directory,
+        filename,
+        conditional=True,
+        etag=True,
+        max_age=AUDIO_MAX_AGE,
+    )
 
 
 if __name__ == "__main__":
-    ensure_database()
     app.run(debug=True, host="0.0.0.0", port=int(os.environ.get("PORT", "8000")))
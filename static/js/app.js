@@ -124,14 +124,9 @@ async function fetchStats() {
         const avg = summary.average_attempts_per_round || 0;
         elements.statAverage.textContent = avg ? avg.toFixed(2) : "0";
 
-        if (data.graphs) {
-            if (data.graphs.accuracy_by_difficulty) {
-                elements.graphAccuracy.src = data.graphs.accuracy_by_difficulty;
-            }
-            if (data.graphs.cumulative_accuracy) {
-                elements.graphCumulative.src = data.graphs.cumulative_accuracy;
-            }
-        }
+        const graphs = data.graphs || {};
+        renderAccuracyChart(elements.graphAccuracy, graphs.accuracy_by_difficulty || []);
+        renderCumulativeChart(elements.graphCumulative, graphs.cumulative_accuracy || []);
 
         if (data.tones) {
             renderToneLists(data.tones);
@@ -143,6 +138,227 @@ async function fetchStats() {
     }
 }
 
+const SVG_NS = "http://www.w3.org/2000/svg";
+const CHART = {
+    width: 550,
+    height: 300,
+    margin: { top: 36, right: 20, bottom: 36, left: 52 },
+};
+
+function themeColor(name) {
+    return getComputedStyle(document.documentElement).getPropertyValue(`--color-${name}`).trim();
+}
+
+function svgElement(tag, attrs = {}, text = null) {
+    const node = document.createElementNS(SVG_NS, tag);
+    Object.entries(attrs).forEach(([key, value]) => node.setAttribute(key, value));
+    if (text !== null) {
+        node.textContent = text;
+    }
+    return node;
+}
+
+function createChart(container, title) {
+    const svg = svgElement("svg", {
+        viewBox: `0 0 ${CHART.width} ${CHART.height}`,
+        role: "img",
+        "aria-label": title,
+    });
+    svg.appendChild(
+        svgElement(
+            "text",
+            {
+                x: CHART.width / 2,
+                y: 22,
+                "text-anchor": "middle",
+                fill: themeColor("text"),
+                "font-size": 15,
+            },
+            title,
+        ),
+    );
+    container.replaceChildren(svg);
+    return svg;
+}
+
+function drawEmptyChart(svg, message) {
+    svg.appendChild(
+        svgElement(
+            "text",
+            {
+                x: CHART.width / 2,
+                y: CHART.height / 2,
+                "text-anchor": "middle",
+                "dominant-baseline": "middle",
+                fill: themeColor("text"),
+                "font-size": 16,
+            },
+            message,
+        ),
+    );
+}
+
+function drawPercentAxis(svg, label) {
+    const { width, height, margin } = CHART;
+    const plotHeight = height - margin.top - margin.bottom;
+    [0, 25, 50, 75, 100].forEach((tick) => {
+        const y = margin.top + plotHeight - (tick / 100) * plotHeight;
+        svg.appendChild(
+            svgElement("line", {
+                x1: margin.left,
+                x2: width - margin.right,
+                y1: y,
+                y2: y,
+                stroke: themeColor("surface0"),
+            }),
+        );
+        svg.appendChild(
+            svgElement(
+                "text",
+                {
+                    x: margin.left - 8,
+                    y,
+                    "text-anchor": "end",
+                    "dominant-baseline": "middle",
+                    fill: themeColor("subtext"),
+                    "font-size": 11,
+                },
+                `${tick}%`,
+            ),
+        );
+    });
+    svg.appendChild(
+        svgElement(
+            "text",
+            {
+                x: 14,
+                y: margin.top + plotHeight / 2,
+                "text-anchor": "middle",
+                transform: `rotate(-90 14 ${margin.top + plotHeight / 2})`,
+                fill: themeColor("text"),
+                "font-size": 12,
+            },
+            label,
+        ),
+    );
+}
+
+function renderAccuracyChart(container, data) {
+    if (!container) {
+        return;
+    }
+    const svg = createChart(container, "Accuracy by Difficulty");
+    if (!data.length) {
+        drawEmptyChart(svg, "No data yet");
+        return;
+    }
+
+    const { width, height, margin } = CHART;
+    const plotWidth = width - margin.left - margin.right;
+    const plotHeight = height - margin.top - margin.bottom;
+    const colors = ["teal", "blue", "lavender"];
+    const slot = plotWidth / data.length;
+    const barWidth = slot * 0.6;
+
+    drawPercentAxis(svg, "Accuracy (%)");
+    data.forEach((entry, index) => {
+        const value = (entry.accuracy || 0) * 100;
+        const barHeight = (value / 100) * plotHeight;
+        const x = margin.left + slot * index + (slot - barWidth) / 2;
+        const y = margin.top + plotHeight - barHeight;
+        svg.appendChild(
+            svgElement("rect", {
+                x,
+                y,
+                width: barWidth,
+                height: barHeight,
+                rx: 3,
+                fill: themeColor(colors[index % colors.length]),
+            }),
+        );
+        svg.appendChild(
+            svgElement(
+                "text",
+                {
+                    x: x + barWidth / 2,
+                    y: y - 6,
+                    "text-anchor": "middle",
+                    fill: themeColor("text"),
+                    "font-size": 11,
+                },
+                `${value.toFixed(1)}%`,
+            ),
+        );
+        svg.appendChild(
+            svgElement(
+                "text",
+                {
+                    x: x + barWidth / 2,
+                    y: height - margin.bottom + 18,
+                    "text-anchor": "middle",
+                    fill: themeColor("text"),
+                    "font-size": 12,
+                },
+                entry.difficulty,
+            ),
+        );
+    });
+}
+
+function renderCumulativeChart(container, points) {
+    if (!container) {
+        return;
+    }
+    const svg = createChart(container, "Cumulative Accuracy");
+    if (points.length < 2) {
+        drawEmptyChart(svg, "Play some rounds to see progress!");
+        return;
+    }
+
+    const { width, height, margin } = CHART;
+    const plotWidth = width - margin.left - margin.right;
+    const plotHeight = height - margin.top - margin.bottom;
+    const baseline = margin.top + plotHeight;
+    const step = plotWidth / (points.length - 1);
+    const coords = points.map((point, index) => [
+        margin.left + step * index,
+        baseline - (point.accuracy || 0) * plotHeight,
+    ]);
+    const line = coords.map(([x, y]) => `${x.toFixed(1)},${y.toFixed(1)}`).join(" ");
+    const peach = themeColor("peach");
+
+    drawPercentAxis(svg, "Cumulative Accuracy (%)");
+    svg.appendChild(
+        svgElement("polygon", {
+            points: `${margin.left},${baseline} ${line} ${width - margin.right},${baseline}`,
+            fill: peach,
+            "fill-opacity": 0.2,
+        }),
+    );
+    svg.appendChild(
+        svgElement("polyline", {
+            points: line,
+            fill: "none",
+            stroke: peach,
+            "stroke-width": 2,
+            "stroke-linejoin": "round",
+        }),
+    );
+    svg.appendChild(
+        svgElement(
+            "text",
+            {
+                x: margin.left + plotWidth / 2,
+                y: height - 8,
+                "text-anchor": "middle",
+                fill: themeColor("text"),
+                "font-size": 12,
+            },
+            "Guess #",
+        ),
+    );
+}
+
 function renderToneLists(tones) {
     renderToneList(elements.toneWorst, tones?.worst, "Keep playing to gather data.");
     renderToneList(elements.toneBest, tones?.best, "Keep playing to gather data.");
@@ -2,11 +2,16 @@ from __future__ import annotations
 
 import argparse
 import dataclasses
+import os
 import re
 import subprocess
 import sys
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple
+from typing import Deque, Iterable, Iterator, List, Sequence, Tuple
 
 try:  # Python 3.11+
     import tomllib
@@ -14,8 +19,19 @@ except ModuleNotFoundError:  # pragma: no cover - fallback for 3.10 runtimes
     import tomli as tomllib  # type: ignore[no-redef]
 
 
-SILENCE_START_RE = re.compile(r"silence_start:\s*([0-9.]+)")
-SILENCE_END_RE = re.compile(r"silence_end:\s*([0-9.]+)")
+SILENCE_RE = re.compile(r"silence_(start|end):\s*([0-9.]+)")
+DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):([0-9.]+)")
+STDERR_TAIL_LINES = 20
+# ffmpeg flags for calls that only report errors: no banner, stream info or
+# progress lines on stderr.
+QUIET_ARGS = ("-hide_banner", "-loglevel", "error", "-nostats")
+EXPORT_BATCH_SIZE = 32
+CODEC_ARGS = {
+    "mp3": ("-acodec", "libmp3lame", "-q:a", "2"),
+    "wav": ("-acodec", "pcm_s16le"),
+    "flac": ("-acodec", "flac"),
+}
+DEFAULT_CODEC_ARGS = ("-acodec", "copy")
 MIN_SEGMENT_DURATION = 0.05
 MERGE_GAPS_SECONDS = [i / 1000 for i in range(60, 301, 10)]
 
@@ -24,6 +40,14 @@ class ConfigError(RuntimeError):
     """Raised when the user configuration is invalid."""
 
 
+class SegmentationError(RuntimeError):
+    """Raised when detected speech cannot be fitted to the requested clips."""
+
+    def __init__(self, message: str, duration: float | None = None) -> None:
+        super().__init__(message)
+        self.duration = duration
+
+
 @dataclasses.dataclass(slots=True)
 class DetectSettings:
     enabled: bool
@@ -94,6 +118,10 @@ class ProcessorConfig:
         )
         if clips.count <= 0:
             raise ConfigError("clips.count must be greater than zero.")
+        if "count" in clips_data and clips.names and len(clips.names) != clips.count:
+            raise ConfigError(
+                f"clips.count ({clips.count}) does not match the number of clip names ({len(clips.names)})."
+            )
         if len(clips.names) < clips.count:
             raise ConfigError(
                 f"Not enough clip names ({len(clips.names)}) for required count ({clips.count})."
@@ -129,14 +157,22 @@ class ToneClipProcessor:
         self.clips_dir.mkdir(parents=True, exist_ok=True)
 
     def run(self) -> dict:
-        wav_path = self._convert_to_reference_wav()
-        duration = self._probe_duration(wav_path)
-        segments = (
-            self._detect_segments(wav_path, duration)
-            if self.config.detect.enabled
-            else self._split_evenly(duration)
-        )
-        fitted_segments = self._fit_segments_to_target(segments)
+        input_path = self.config.general.input_path
+        fitted_segments: List[Tuple[float, float]] | None = None
+        duration: float | None = None
+        if self.config.detect.enabled:
+            try:
+                segments, duration = self._detect_segments(input_path)
+                fitted_segments = self._fit_segments_to_target(segments)
+            except SegmentationError as exc:
+                print(f"Warning: {exc} Falling back to an even split.", file=sys.stderr)
+                if duration is None:
+                    duration = exc.duration
+        if fitted_segments is None:
+            # Only probe when the silencedetect pass did not already report it.
+            if duration is None:
+                duration = self._probe_duration(input_path)
+            fitted_segments = self._split_evenly(duration)
         exports = self._export_segments(fitted_segments)
         combined_path = self._combine_exports(exports)
         return {
@@ -146,25 +182,6 @@ class ToneClipProcessor:
             "duration": duration,
         }
 
-    def _convert_to_reference_wav(self) -> Path:
-        output_dir = self.config.general.output_dir
-        wav_path = output_dir / f"{self.config.general.input_path.stem}_mono16k.wav"
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-i",
-            str(self.config.general.input_path),
-            "-ac",
-            "1",
-            "-ar",
-            "16000",
-            "-acodec",
-            "pcm_s16le",
-            str(wav_path),
-        ]
-        self._run(cmd, capture_output=True)
-        return wav_path
-
     def _probe_duration(self, path: Path) -> float:
         cmd = [
             "ffprobe",
@@ -182,25 +199,34 @@ class ToneClipProcessor:
         except (TypeError, ValueError) as exc:
             raise RuntimeError("Unable to parse media duration.") from exc
 
-    def _detect_segments(self, wav_path: Path, duration: float) -> List[Tuple[float, float]]:
+    def _detect_segments(self, input_path: Path) -> Tuple[List[Tuple[float, float]], float]:
+        # Downmix to 16 kHz mono inside the filter graph rather than through
+        # an intermediate WAV file.
         cmd = [
             "ffmpeg",
             "-i",
-            str(wav_path),
+            str(input_path),
+            "-vn",
+            "-map",
+            "0:a:0",
             "-af",
+            "aformat=sample_rates=16000:channel_layouts=mono,"
             f"silencedetect=noise={self.config.detect.noise_db}dB:d={self.config.detect.min_silence}",
             "-f",
             "null",
             "-",
         ]
-        result = self._run(cmd, capture_output=True, text=True)
-        starts, ends = self._parse_silence_log(result.stderr or "")
+        starts, ends, duration = self._parse_silence_log(self._run_streaming(cmd))
+        if duration is None:
+            duration = self._probe_duration(input_path)
         silences = self._pair_silences(starts, ends, duration)
         speech_segments = self._silences_to_speech(silences, duration)
         padded = self._apply_padding(speech_segments, duration)
         if not padded:
-            raise RuntimeError("No speech regions were detected with the current settings.")
-        return padded
+            raise SegmentationError(
+                "No speech regions were detected with the current settings.", duration
+            )
+        return padded, duration
 
     def _split_evenly(self, duration: float) -> List[Tuple[float, float]]:
         segment_length = duration / self.config.clips.count
@@ -215,28 +241,35 @@ class ToneClipProcessor:
         self, segments: Sequence[Tuple[float, float]]
     ) -> List[Tuple[float, float]]:
         if not segments:
-            raise RuntimeError("No segments available to fit.")
+            raise SegmentationError("No segments available to fit.")
         target = self.config.clips.count
-        ordered = sorted(segments, key=lambda item: item[0])
-        if len(ordered) == target:
-            return list(ordered)
-        if len(ordered) < target:
-            raise RuntimeError(
-                f"Detected only {len(ordered)} segments but need {target}. "
+        if len(segments) == target:
+            return list(segments)
+        if len(segments) < target:
+            raise SegmentationError(
+                f"Detected only {len(segments)} segments but need {target}. "
                 "Increase noise threshold or reduce requested clips."
             )
 
-        best = list(ordered)
-        for gap in MERGE_GAPS_SECONDS:
-            merged = self._merge_adjacent(best, gap)
-            if len(merged) <= target:
-                best = merged
-                break
-            best = merged
+        # Merging at a gap size g leaves 1 + (number of gaps > g) segments, so
+        # the smallest gap that reaches the target is the target-th largest
+        # gap; pick the first configured gap at or above it.
+        gaps: List[float] = []
+        # Segments arrive in start order: silencedetect reports silences in
+        # order and padding shifts every start by the same amount.
+        last_end = segments[0][1]
+        for start, end in islice(segments, 1, None):
+            gaps.append(start - last_end)
+            if end > last_end:
+                last_end = end
+        gaps.sort()
+        threshold = gaps[len(gaps) - target]
+        gap_index = min(bisect_left(MERGE_GAPS_SECONDS, threshold), len(MERGE_GAPS_SECONDS) - 1)
+        best = self._merge_adjacent(segments, MERGE_GAPS_SECONDS[gap_index])
         if len(best) > target:
             best = best[:target]
         if len(best) < target:
-            raise RuntimeError(
+            raise SegmentationError(
                 f"Unable to reduce segments to exactly {target}; detected {len(best)} after merging."
             )
         return best
@@ -244,40 +277,64 @@ class ToneClipProcessor:
     def _merge_adjacent(
         self, segments: Sequence[Tuple[float, float]], gap_size: float
     ) -> List[Tuple[float, float]]:
-        merged: List[Tuple[float, float]] = [segments[0]]
-        for start, end in segments[1:]:
-            last_start, last_end = merged[-1]
+        merged: List[Tuple[float, float]] = []
+        last_start, last_end = segments[0]
+        for start, end in islice(segments, 1, None):
             if start - last_end <= gap_size:
-                merged[-1] = (last_start, max(last_end, end))
+                if end > last_end:
+                    last_end = end
             else:
-                merged.append((start, end))
+                merged.append((last_start, last_end))
+                last_start, last_end = start, end
+        merged.append((last_start, last_end))
         return merged
 
     def _export_segments(
         self, segments: Sequence[Tuple[float, float]]
     ) -> List[dict]:
-        exports = []
         fmt = self.config.general.audio_format
+        input_arg = str(self.config.general.input_path)
         codec_args = self._codec_args(fmt)
-        for idx, (start, end) in enumerate(segments):
+        # Clips are exported in contiguous batches, one ffmpeg process per
+        # batch; subprocess waits release the GIL, so threads run the batches
+        # side by side.
+        workers = os.cpu_count() or 1
+        batch_size = min(EXPORT_BATCH_SIZE, -(-len(segments) // workers))
+        batches = [
+            range(first, min(first + batch_size, len(segments)))
+            for first in range(0, len(segments), batch_size)
+        ]
+        exports: List[dict] = []
+        with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+            for batch_exports in executor.map(
+                lambda batch: self._export_batch(batch, segments, fmt, input_arg, codec_args),
+                batches,
+            ):
+                exports.extend(batch_exports)
+        return exports
+
+    def _export_batch(
+        self,
+        indices: range,
+        segments: Sequence[Tuple[float, float]],
+        fmt: str,
+        input_arg: str,
+        codec_args: Sequence[str],
+    ) -> List[dict]:
+        # Every clip gets its own input seeked before -i, so the demuxer jumps
+        # straight to it, and its own output mapped from that input.
+        cmd = ["ffmpeg", "-y", *QUIET_ARGS]
+        for idx in indices:
+            start, end = segments[idx]
+            cmd.extend(("-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", input_arg))
+        # Resolved once per batch so the concat list needs no per-clip stat.
+        clips_posix = self.clips_dir.resolve().as_posix()
+        exports = []
+        for input_index, idx in enumerate(indices):
+            start, end = segments[idx]
             clip_name = self.config.clips.names[idx]
-            output_path = (
-                self.clips_dir
-                / f"{clip_name}.{fmt}"
-            )
-            cmd = [
-                "ffmpeg",
-                "-y",
-                "-i",
-                str(self.config.general.input_path),
-                "-ss",
-                f"{start:.3f}",
-                "-to",
-                f"{end:.3f}",
-            ]
-            cmd.extend(codec_args)
-            cmd.append(str(output_path))
-            self._run(cmd, capture_output=True)
+            output_path = self.clips_dir / f"{clip_name}.{fmt}"
+            cmd.extend(("-map", f"{input_index}:a:0", *codec_args, str(output_path)))
             exports.append(
                 {
                     "name": clip_name,
@@ -285,18 +342,14 @@ class ToneClipProcessor:
                     "end": round(end, 3),
                     "duration": round(end - start, 3),
                     "path": output_path,
+                    "posix_path": f"{clips_posix}/{clip_name}.{fmt}",
                 }
             )
+        self._run_silent(cmd)
         return exports
 
-    def _codec_args(self, fmt: str) -> list[str]:
-        if fmt == "mp3":
-            return ["-acodec", "libmp3lame", "-q:a", "2"]
-        if fmt == "wav":
-            return ["-acodec", "pcm_s16le"]
-        if fmt == "flac":
-            return ["-acodec", "flac"]
-        return ["-acodec", "copy"]
+    def _codec_args(self, fmt: str) -> Tuple[str, ...]:
+        return CODEC_ARGS.get(fmt, DEFAULT_CODEC_ARGS)
 
     def _combine_exports(self, exports: Sequence[dict]) -> Path:
         combined_path = self.config.general.output_dir / self.config.general.combined_name
@@ -304,13 +357,16 @@ class ToneClipProcessor:
             raise RuntimeError("No exports available to combine.")
         concat_file = self.config.general.output_dir / ".tone_concat.txt"
         try:
-            with concat_file.open("w", encoding="utf-8") as fh:
-                for export in exports:
-                    escaped = export["path"].resolve().as_posix().replace("'", r"\'")
-                    fh.write(f"file '{escaped}'\n")
+            # The concat demuxer reads quoted paths literally, so a quote is
+            # written as close-quote, escaped quote, reopen: '\''.
+            escaped = (export["posix_path"].replace("'", r"'\''") for export in exports)
+            concat_file.write_text(
+                "".join(f"file '{path}'\n" for path in escaped), encoding="utf-8"
+            )
             cmd = [
                 "ffmpeg",
                 "-y",
+                *QUIET_ARGS,
                 "-f",
                 "concat",
                 "-safe",
@@ -321,7 +377,7 @@ class ToneClipProcessor:
                 "copy",
                 str(combined_path),
             ]
-            self._run(cmd, capture_output=True)
+            self._run_silent(cmd)
         finally:
             if concat_file.exists():
                 concat_file.unlink()
@@ -331,57 +387,52 @@ class ToneClipProcessor:
         self, segments: Iterable[Tuple[float, float]], duration: float
     ) -> List[Tuple[float, float]]:
         pad = self.config.detect.pad
-        padded = []
-        for start, end in segments:
-            window_start = max(0.0, start - pad)
-            window_end = min(duration, end + pad)
-            if window_end - window_start >= MIN_SEGMENT_DURATION:
-                padded.append((window_start, window_end))
-        return padded
+        windows = ((max(0.0, start - pad), min(duration, end + pad)) for start, end in segments)
+        return [(start, end) for start, end in windows if end - start >= MIN_SEGMENT_DURATION]
 
     def _silences_to_speech(
-        self, silences: Iterable[Tuple[float, float]], duration: float
+        self, silences: Sequence[Tuple[float, float]], duration: float
     ) -> List[Tuple[float, float]]:
-        speech_segments = []
-        previous_end = 0.0
-        for start, end in silences:
-            if start - previous_end > 1e-3:
-                speech_segments.append((previous_end, start))
-            previous_end = end
-        if duration - previous_end > 1e-3:
-            speech_segments.append((previous_end, duration))
-        return speech_segments
+        # Speech runs from each silence's end to the next silence's start.
+        speech_starts = [0.0, *(end for _, end in silences)]
+        speech_ends = [*(start for start, _ in silences), duration]
+        return [
+            (start, end)
+            for start, end in zip(speech_starts, speech_ends)
+            if end - start > 1e-3
+        ]
 
     def _pair_silences(
         self, starts: Sequence[float], ends: Sequence[float], duration: float
     ) -> List[Tuple[float, float]]:
-        events = [("start", value) for value in starts] + [
-            ("end", value) for value in ends
-        ]
-        events.sort(key=lambda item: item[1])
-        silences = []
-        current_start: float | None = None
-        for kind, timestamp in events:
-            if kind == "start":
-                if current_start is None:
-                    current_start = timestamp
-            else:
-                if current_start is None:
-                    current_start = 0.0
-                silences.append((current_start, timestamp))
-                current_start = None
-        if current_start is not None:
-            silences.append((current_start, duration))
+        # ffmpeg reports silences in order, so starts[i] pairs with ends[i].
+        # Input that opens in silence reports an end without a start, and
+        # input that closes in silence a start without an end.
+        if ends and (not starts or ends[0] < starts[0]):
+            starts = [0.0, *starts]
+        silences = list(zip(starts, ends))
+        if len(starts) > len(ends):
+            silences.append((starts[len(ends)], duration))
         return silences
 
-    def _parse_silence_log(self, log: str) -> Tuple[List[float], List[float]]:
-        starts, ends = [], []
-        for line in log.splitlines():
-            if match := SILENCE_START_RE.search(line):
-                starts.append(float(match.group(1)))
-            if match := SILENCE_END_RE.search(line):
-                ends.append(float(match.group(1)))
-        return starts, ends
+    def _parse_silence_log(
+        self, lines: Iterable[str]
+    ) -> Tuple[List[float], List[float], float | None]:
+        starts: List[float] = []
+        ends: List[float] = []
+        append = {"start": starts.append, "end": ends.append}
+        duration: float | None = None
+        for line in lines:
+            # Most stderr lines are progress/stream info; a substring test
+            # rejects them without entering the regex engine.
+            if "silence_" in line:
+                if match := SILENCE_RE.search(line):
+                    kind, value = match.groups()
+                    append[kind](float(value))
+            elif duration is None and "Duration:" in line and (match := DURATION_RE.search(line)):
+                hours, minutes, seconds = match.groups()
+                duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        return starts, ends, duration
 
     def _run(
         self,
@@ -404,6 +455,39 @@ class ToneClipProcessor:
             )
         return result
 
+    def _run_silent(self, cmd: Sequence[str]) -> None:
+        """Run a command whose output is only needed when it fails."""
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            check=False,
+        )
+        if result.returncode != 0:
+            stderr = result.stderr.decode(errors="replace").strip()
+            raise RuntimeError(f"Command failed ({' '.join(cmd)}):\nSTDERR: {stderr}")
+
+    def _run_streaming(self, cmd: Sequence[str]) -> Iterator[str]:
+        """Yield stderr lines as the command writes them."""
+        tail: Deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+        with subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        ) as proc:
+            assert proc.stderr is not None
+            for line in proc.stderr:
+                tail.append(line)
+                yield line
+            returncode = proc.wait()
+        if returncode != 0:
+            stderr = "".join(tail).strip()
+            raise RuntimeError(
+                f"Command failed ({' '.join(cmd)}):\nSTDERR: {stderr}"
+            )
+
 
 def parse_args(argv: Sequence[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Split tone audio into labeled clips.")